@@ -1,42 +1,63 @@
+import re
+import time
 from datetime import datetime, timedelta, timezone
 
+# Compiled once at import; one C-level pass extracts every name=value pair
+# (the pattern skips separators and whitespace, so no per-item strip is needed).
+_COOKIE_RE = re.compile(r'([^=;\s]+)=([^;]*)')
+
 def parse_session_cookie(cookie_header):
-    """Parse session information from Cookie header."""
-    session_info = {
-        'session_id': None,
-        'auth': None
+    """Parse session information from Cookie header.
+
+    Only two cookie names are ever consulted, so the header is scanned
+    once for those prefixes instead of materializing a dict of every
+    cookie the client sent.
+    """
+    session_id = auth = None
+
+    if cookie_header:
+        for item in cookie_header.split(';'):
+            item = item.strip()
+            if item.startswith('sessionId='):
+                session_id = item[10:]
+            elif item.startswith('auth='):
+                auth = item[5:]
+
+    return {
+        'session_id': session_id,
+        'auth': auth,
     }
-    
-    if not cookie_header:
-        return session_info
-    
-    cookies = {}
-    for item in cookie_header.split('; '):
-        if '=' in item:
-            key, value = item.split('=', 1)
-            cookies[key.strip()] = value.strip()
-    
-    session_info['session_id'] = cookies.get('sessionId')
-    session_info['auth'] = cookies.get('auth')
-    
-    return session_info
+
+
+# [epoch second, max_age, formatted string] — the Expires value only changes
+# when the second or the max_age does, so strftime runs at most once per
+# second for the common fixed-max_age login path.
+_EXPIRES_CACHE = [0, -1, '']
 
 
 def create_session_cookie(session_id, max_age=3600):
     """Create a Set-Cookie header for session."""
-    expires = datetime.now(timezone.utc) + timedelta(seconds=max_age)
-    expires_str = expires.strftime('%a, %d %b %Y %H:%M:%S GMT')
-    
+    now = int(time.time())
+    if _EXPIRES_CACHE[0] != now or _EXPIRES_CACHE[1] != max_age:
+        expires = datetime.now(timezone.utc) + timedelta(seconds=max_age)
+        _EXPIRES_CACHE[0] = now
+        _EXPIRES_CACHE[1] = max_age
+        _EXPIRES_CACHE[2] = expires.strftime('%a, %d %b %Y %H:%M:%S GMT')
+
     cookie = "sessionId={}; Path=/; HttpOnly; Max-Age={}; Expires={}".format(
-        session_id, max_age, expires_str
+        session_id, max_age, _EXPIRES_CACHE[2]
     )
-    
+
     return cookie
 
 
+# The logout cookie never varies, so it is formatted exactly once.
+_LOGOUT_COOKIE = (
+    "sessionId=; Path=/; HttpOnly; Max-Age=0; "
+    "Expires=Thu, 01 Jan 1970 00:00:00 GMT"
+)
+
+
 def create_logout_cookie():
     """Create a Set-Cookie header to clear session cookie."""
-    expires_str = 'Thu, 01 Jan 1970 00:00:00 GMT'
-    cookie = "sessionId=; Path=/; HttpOnly; Max-Age=0; Expires={}".format(expires_str)
-    
-    return cookie
\ No newline at end of file
+    return _LOGOUT_COOKIE
\ No newline at end of file
@@ -102,8 +102,8 @@ class HttpAdapter:
         # Response handler
         resp = self.response
 
-        # Handle the request
-        msg = conn.recv(1024).decode()
+        # Handle the request; the parser works on the raw bytes directly
+        msg = conn.recv(1024)
 
         req.prepare(msg, routes)
         # Handle request hook
@@ -114,9 +114,9 @@ class HttpAdapter:
             # TODO: handle for App hook here
             #
 
-        # Build response
+        # Build response and emit it; send() streams static file bodies
         response = resp.build_response(req)
-        conn.sendall(response)
+        resp.send(conn, response)
         conn.close()
 
     @property
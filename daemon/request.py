@@ -8,6 +8,30 @@ This module provides a Request object to manage and persist
 request settings (cookies, auth, proxies).
 """
 from .dictionary import CaseInsensitiveDict
+from .cookie import _COOKIE_RE
+
+
+#: Raw header names every browser sends, pre-mapped (in the casings seen on
+#: the wire) to their interned lowercase str form. A hit here replaces the
+#: per-header decode + .lower() with one dict lookup, and the interned
+#: results make the cookie/content-length comparisons pointer-fast.
+_KNOWN_HEADERS = {}
+for _name in ('Host', 'Connection', 'Cookie', 'Content-Length',
+              'Content-Type', 'User-Agent', 'Accept', 'Accept-Language',
+              'Accept-Encoding', 'Referer', 'Origin', 'Authorization',
+              'Cache-Control', 'Upgrade-Insecure-Requests'):
+    _lower = _name.lower()
+    _KNOWN_HEADERS[_name.encode('ascii')] = _lower
+    _KNOWN_HEADERS[_lower.encode('ascii')] = _lower
+
+
+def _parse_cl(val):
+    """Parse a Content-Length value without exception machinery.
+
+    str.isdigit rejects empty strings, signs and junk up front, so a
+    malformed (or negative) value yields 0 instead of raising.
+    """
+    return int(val) if val.isdigit() else 0
 
 class Request():
     """The fully mutable "class" `Request <Request>` object,
@@ -56,36 +80,79 @@ class Request():
         #: Hook point for routed mapped-path
         self.hook = None
 
-    def extract_request_line(self, request):
-        try:
-            lines = request.splitlines()
-            first_line = lines[0]
-            method, path, version = first_line.split()
+    def _parse_request(self, raw):
+        """Parse request line, headers, cookies and body in a single pass.
+
+        The raw buffer is traversed once: the head is cut from the body at
+        the first CRLFCRLF, the request line and each header line are sliced
+        out of the head, and the Cookie / Content-Length headers are handled
+        inline while the scan runs instead of in separate passes afterwards.
 
-            if path == '/':
-                path = '/index.html'
-        except Exception:
-            return None, None, None
+        :params raw (bytes): raw HTTP message as received from the socket.
 
-        return method, path, version
+        :rtype tuple: (method, path, version, headers, cookies, body).
+        """
+        head, _, body = raw.partition(b'\r\n\r\n')
+
+        # Two find()s slice the request line in place — no intermediate
+        # 3-element list and no decode of anything but the slices kept.
+        eol = head.find(b'\r\n')
+        if eol < 0:
+            eol = len(head)
+        line0 = head[:eol]
+        sp1 = line0.find(b' ')
+        sp2 = line0.find(b' ', sp1 + 1)
+        if sp1 < 0 or sp2 < 0:
+            return None, None, None, {}, None, b''
+        method = line0[:sp1].decode('utf-8', 'ignore')
+        path = line0[sp1 + 1:sp2].decode('utf-8', 'ignore')
+        version = line0[sp2 + 1:].decode('utf-8', 'ignore')
+        if path == '/':
+            path = '/index.html'
 
-    def prepare_headers(self, request):
-        """Prepares the given HTTP headers."""
-        lines = request.split('\r\n')
         headers = {}
-        for line in lines[1:]:
-            if ': ' in line:
-                key, val = line.split(': ', 1)
-                headers[key] = val
-        return headers
+        cookies = None
+        content_length = 0
+        # Walk the head with find() instead of split(): each CRLF is located
+        # by the C-level memchr scan and only the current line is sliced, so
+        # no list of every header line is ever materialized.
+        pos = eol + 2
+        end = len(head)
+        while pos < end:
+            nxt = head.find(b'\r\n', pos)
+            if nxt < 0:
+                nxt = end
+            line = head[pos:nxt]
+            pos = nxt + 2
+            key, sep, val = line.partition(b': ')
+            if not sep:
+                continue
+            # Header names are normalized to lowercase once at insertion so
+            # every later access is a plain dict hit with a lowercase literal;
+            # known names skip the decode + lower entirely.
+            known = _KNOWN_HEADERS.get(key)
+            key = known if known is not None else key.decode('utf-8', 'ignore').lower()
+            val = val.decode('utf-8', 'ignore')
+            headers[key] = val
+            if key == 'cookie':
+                cookies = dict(_COOKIE_RE.findall(val))
+            elif key == 'content-length':
+                content_length = _parse_cl(val)
+
+        if content_length > 0 and len(body) >= content_length:
+            body = body[:content_length]
+
+        return method, path, version, headers, cookies, body
 
     def prepare(self, request, routes=None):
         """Prepares the entire request with the given parameters."""
 
-        # Prepare the request line from the request header
-        #print(f"{request}")
-        self.method, self.path, self.version = self.extract_request_line(request)
-        #print("[Request] {} path {} version {}".format(self.method, self.path, self.version))
+        if isinstance(request, str):
+            # Best-effort encode so the parser can work on the raw bytes
+            request = request.encode('utf-8', 'ignore')
+
+        (self.method, self.path, self.version,
+         self.headers, self.cookies, self.body) = self._parse_request(request)
 
         #
         # @bksysnet Preapring the webapp hook with WeApRous instance
@@ -93,30 +160,21 @@ class Request():
         #
         # TODO: manage the webapp hook in this mounting point
         #
-        
-        if not routes == {}:
+
+        if routes:
             self.routes = routes
             self.hook = routes.get((self.method, self.path))
 
-        self.headers = self.prepare_headers(request)
-        cookies = self.headers.get('Cookie', '')
-        for item in cookies.split('; '):
-            if '=' in item:
-                key, value = item.split('=', 1)
-                if self.cookies is None:
-                    self.cookies = {}
-                self.cookies[key] = value
-
-        # Body (bytes) — sliced by Content-Length if present
-        _, body_bytes = self.split_head_body(request)
-        try:
-            cl = int(self.headers.get('Content-Length', '0') or 0)
-        except Exception:
-            cl = 0
-        if cl > 0 and len(body_bytes) >= cl:
-            body_bytes = body_bytes[:cl]
-        self.body = body_bytes
-        self.prepare_body(self.body, files=None)
+        # Form decoding only pays off for urlencoded POST bodies; GETs and
+        # other content types keep the raw bytes untouched (handlers fall
+        # back to an empty dict via ``request.body or {}``).
+        ctype = (self.headers or {}).get('content-type', '')
+        if (self.method == 'POST' and self.body
+                and (not ctype
+                     or ctype.startswith('application/x-www-form-urlencoded'))):
+            self.prepare_body(self.body, files=None)
+        else:
+            self.prepare_content_length(self.body)
 
     def prepare_body(self, data, files, json=None):
         self.prepare_content_length(self.body)
@@ -138,14 +196,14 @@ class Request():
 
 
     def prepare_content_length(self, body):
-        self.headers["Content-Length"] = "0"
+        self.headers["content-length"] = "0"
         #
         # TODO prepare the request authentication
         #
         # self.auth = ...
         if self.headers is None:
             self.headers = {}
-        self.headers["Content-Length"] = str(len(body) if body else 0)
+        self.headers["content-length"] = str(len(body) if body else 0)
         return
 
 
@@ -167,33 +225,14 @@ class Request():
             username, password = auth
             credentials = f"{username}:{password}"
             encoded = base64.b64encode(credentials.encode('utf-8')).decode('ascii')
-            self.headers["Authorization"] = f"Basic {encoded}"
+            self.headers["authorization"] = f"Basic {encoded}"
             self.auth = auth
         elif isinstance(auth, str):
             # Bearer Token Authentication
-            self.headers["Authorization"] = f"Bearer {auth}"
+            self.headers["authorization"] = f"Bearer {auth}"
             self.auth = auth
         else:
             self.auth = auth
 
     def prepare_cookies(self, cookies):
-            self.headers["Cookie"] = cookies
-
-    def split_head_body(self, request: str):
-        """
-        Split raw HTTP message into (head:str, body:bytes).
-        - Accepts either str or bytes as input.
-        - Returns the header section as UTF-8 text (best-effort) and the raw body bytes.
-        """
-        if isinstance(request, bytes):
-            raw = request
-        else:
-            # Best-effort encode so we can safely partition on CRLFCRLF
-            raw = request.encode("utf-8", "ignore")
-
-        # Split on the first empty line (CRLFCRLF)
-        head_bytes, sep, body_bytes = raw.partition(b"\r\n\r\n")
-
-        # Decode headers to str for easier parsing; keep body as bytes
-        head_str = head_bytes.decode("utf-8", "ignore")
-        return head_str, body_bytes
\ No newline at end of file
+            self.headers["cookie"] = cookies
\ No newline at end of file
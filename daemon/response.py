@@ -11,16 +11,22 @@ The current version supports MIME type detection, content loading and header for
 """
 import os
 import json
+import time
 import socket
+import struct
+import logging
+import selectors
 import datetime
-import mimetypes
+import functools
 import threading
 
+from email.utils import formatdate
+
 from .dictionary import CaseInsensitiveDict
 from urllib.parse import unquote_plus
 
 from db.session import session_manager
-from db import peer_list, history_chat,connections
+from db import peer_list, history_chat, connections, peers_lock, chat_lock
 
 from .cookie import (
     parse_session_cookie,
@@ -28,100 +34,425 @@ from .cookie import (
     create_logout_cookie,
 )
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = ""
+
+#: Mapping of every supported MIME type to its base directory, computed once
+#: at import so the per-request lookup is a single dict hit instead of the
+#: main_type/sub_type branch cascade.
+_MIME_BASE = {
+    'text/plain': BASE_DIR + "static/",
+    'text/css': BASE_DIR + "static/",
+    'text/html': BASE_DIR + "www/",
+    'image/png': BASE_DIR + "static/images/",
+    'image/jpeg': BASE_DIR + "static/images/",
+    'image/vnd.microsoft.icon': BASE_DIR + "static/images/",
+    'image/x-icon': BASE_DIR + "static/images/",
+    'application/x-x509-ca-cert': BASE_DIR + "cert/",
+    'application/javascript': BASE_DIR + "static/js/",
+    'application/python': BASE_DIR + "apps/",
+}
+
+
+#: The handful of extensions this app actually serves, hard-coded so mime
+#: resolution is a dict hit with no mimetypes machinery (or mime.types
+#: file I/O) behind it.
+_MIME_TABLE = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.ico': 'image/x-icon',
+    '.txt': 'text/plain',
+    '.crt': 'application/x-x509-ca-cert',
+    '.pem': 'application/x-x509-ca-cert',
+    '.py': 'application/python',
+}
+
+
+def _guess_mime(ext):
+    """Resolve a file extension to a MIME type via the hard-coded table."""
+    return _MIME_TABLE.get(ext.lower(), 'application/octet-stream')
+
+
+#: extension -> (mime type, base dir) for statically served assets; one
+#: dict hit replaces the extension->mime and mime->dir hops in the static
+#: branch. The pages reference assets as /css/... /js/... /images/..., so
+#: everything but HTML roots at static/ and the request path supplies the
+#: subdirectory.
+_EXT_INFO = {
+    '.html': ('text/html', BASE_DIR + "www/"),
+    '.css': ('text/css', BASE_DIR + "static/"),
+    '.js': ('application/javascript', BASE_DIR + "static/"),
+    '.png': ('image/png', BASE_DIR + "static/"),
+    '.jpg': ('image/jpeg', BASE_DIR + "static/"),
+    '.jpeg': ('image/jpeg', BASE_DIR + "static/"),
+    '.ico': ('image/x-icon', BASE_DIR + "static/"),
+    '.txt': ('text/plain', BASE_DIR + "static/"),
+}
+
+
+#: Response-header template pre-encoded once at import; only the handful of
+#: dynamic fields are substituted per response via C-level bytes formatting.
+_RESPONSE_HDR_TEMPLATE = (
+    b"Accept: %b\r\n"
+    b"Accept-Language: %b\r\n"
+    b"Authorization: %b\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"Content-Type: %b\r\n"
+    b"Content-Length: %d\r\n"
+    b"Date: %b\r\n"
+    b"Max-Forward: 10\r\n"
+    b"Pragma: no-cache\r\n"
+    b"Proxy-Authorization: Basic dXNlcjpwYXNz\r\n"
+    b"Warning: 199 Miscellaneous warning\r\n"
+    b"User-Agent: %b"
+)
+
+
+#: [epoch second, formatted date bytes] — the RFC-1123 Date header only
+#: changes once per second, so it is recomputed at most once per second
+#: and shared by every response built within that second.
+_CACHED_DATE = [0, b'']
+
+
+def _http_date():
+    """Return the current Date header value, cached per second."""
+    now = int(time.time())
+    if now != _CACHED_DATE[0]:
+        _CACHED_DATE[0] = now
+        _CACHED_DATE[1] = formatdate(now, usegmt=True).encode('ascii')
+    return _CACHED_DATE[1]
+
+
+#: Fixed responses and header prefixes, encoded once at import instead of
+#: being rebuilt from f-strings and re-encoded on every request.
+_NOTFOUND = (
+    "HTTP/1.1 404 Not Found\r\n"
+    "Accept-Ranges: bytes\r\n"
+    "Content-Type: text/html\r\n"
+    "Content-Length: 13\r\n"
+    "Cache-Control: max-age=86000\r\n"
+    "Connection: close\r\n"
+    "\r\n"
+    "404 Not Found"
+).encode('utf-8')
+
+_HDR_200_HTML = b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+_HDR_401_HTML = b"HTTP/1.1 401 Unauthorized\r\nContent-Type: text/html; charset=utf-8\r\n"
+_HDR_200_TEXT = b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+_HDR_400_TEXT = b"HTTP/1.1 400 Bad Request\r\nContent-Type: text/plain; charset=utf-8\r\n"
+
+
+def _build_page(header_prefix, content, cookie=None):
+    """Assemble a response from a pre-encoded header prefix and content.
+
+    The parts are returned as a scatter list instead of one concatenated
+    buffer; :meth:`Response.send` hands the list to ``sock.sendmsg`` so the
+    body bytes are never copied into a fresh header+body buffer.
+
+    :params header_prefix (bytes): status line + Content-Type, pre-encoded.
+    :params content (bytes): response body.
+    :params cookie (str): optional Set-Cookie value.
+
+    :rtype list: buffers making up the complete HTTP response, in order.
+    """
+    parts = [header_prefix]
+    if cookie:
+        parts.append(b"Set-Cookie: " + cookie.encode('utf-8') + b"\r\n")
+    parts.append(b"Content-Length: " + str(len(content)).encode('ascii'))
+    parts.append(b"\r\nConnection: close\r\n\r\n")
+    parts.append(content)
+    return parts
+
+
+#: Files larger than this are read straight from disk instead of cached.
+_FILE_CACHE_MAX_BYTES = 1048576
+
+#: filepath -> (mtime, size, bytes); the mtime is re-checked against
+#: os.stat on every hit, so an edited file is re-read on its next request
+#: instead of being served stale — and unlike an lru_cache keyed on
+#: (path, mtime), stale generations are replaced in place rather than
+#: lingering until they age out.
+_FILE_CACHE = {}
+_FILE_CACHE_LOCK = threading.Lock()
+
+
+def _load_bytes(filepath, mtime):
+    """Read a file as raw bytes, cached per path and validated by mtime."""
+    with _FILE_CACHE_LOCK:
+        entry = _FILE_CACHE.get(filepath)
+        if entry is not None and entry[0] == mtime:
+            return entry[2]
+
+    with open(filepath, 'rb') as f:
+        content = f.read()
+
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE[filepath] = (mtime, len(content), content)
+    return content
+
+
+#: Real (symlink-resolved) root of every base directory, computed once at
+#: import so per-request validation is a cached prefix check.
+_BASE_REAL = {base: os.path.realpath(base) for base in set(_MIME_BASE.values())}
+
+
+@functools.lru_cache(maxsize=512)
+def _resolve_path(base_dir, path):
+    """Map a request path to a validated absolute filepath.
+
+    Returns None when the resolved path escapes the base directory
+    (e.g. via ``../`` segments), so traversal attempts turn into a 404.
+    The (base_dir, path) pairs a webapp sees form a small set, so the
+    realpath syscalls are amortized away by the cache.
+    """
+    base = _BASE_REAL.get(base_dir) or os.path.realpath(base_dir)
+    full = os.path.realpath(os.path.join(base, path.lstrip('/')))
+    if full != base and not full.startswith(base + os.sep):
+        return None
+    return full
+
+
 peer_sockets = {}  # Lưu socket listener của từng peer
 # hàm để thêm các mối kết nối vô
 def add_connection(ip1, port1, ip2, port2):
     a = f"{ip1}:{port1}"
     b = f"{ip2}:{port2}"
-    connections.setdefault(a, set()).add(b)
-    connections.setdefault(b, set()).add(a)
+    with peers_lock:
+        connections.setdefault(a, set()).add(b)
+        connections.setdefault(b, set()).add(a)
 
 
-def handle_peer_message(conn, addr, my_ip, my_port):
+def _process_peer_payload(data, addr, my_ip, my_port):
+    """Handle one peer-protocol frame, working on the raw bytes.
+
+    The control fields (command, ip, port) are plain ASCII, so the frame
+    is matched and split as bytes with a bounded split; only the fields
+    that are actually kept get decoded.
+    """
     try:
-        data = conn.recv(1024).decode()
-        if not data:
-            return
-        print(f"[Peer] Nhận từ {addr}: {data}")
+        logger.debug("[Peer] Nhận từ %s: %s", addr, data)
 
-        if data.startswith("CONNECT_REQUEST"):
-            src = data.split(" ")[1]
-            print(f"🔗 Nhận CONNECT_REQUEST từ {src}, auto-accept luôn!")
+        if data.startswith(b"CONNECT_REQUEST"):
+            src = data.split(b" ")[1]
+            logger.debug("🔗 Nhận CONNECT_REQUEST từ %s, auto-accept luôn!", src)
 
             # gửi CONFIRM_CONNECT ngược lại cho peer gửi yêu cầu
             try:
-                ip, port = src.split(":")
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.connect((ip, int(port)))
-                    s.sendall(b"CONFIRM_CONNECT")
-                    print(f"✅ Đã CONFIRM_CONNECT với {src}")
+                ip, port = src.split(b":")
+                _send_frame(ip.decode('ascii'), port.decode('ascii'),
+                            b"CONFIRM_CONNECT")
+                logger.debug("✅ Đã CONFIRM_CONNECT với %s", src)
             except Exception as e:
-                print(f"❌ Lỗi khi gửi CONFIRM_CONNECT: {e}")
+                logger.error("❌ Lỗi khi gửi CONFIRM_CONNECT: %s", e)
 
-        elif data == "CONFIRM_CONNECT":
-            print(f"✅ Kết nối được xác nhận từ {addr}")
-        elif data.startswith("CHAT_MESSAGE"):
-            parts = data.split("|")
+        elif data == b"CONFIRM_CONNECT":
+            logger.debug("✅ Kết nối được xác nhận từ %s", addr)
+        elif data.startswith(b"CHAT_MESSAGE"):
+            # bounded split: at most 4 fields, msg giữ nguyên mọi dấu '|'
+            parts = data.split(b"|", 3)
             if len(parts) >= 4:
-                src_ip, src_port, msg = parts[1], (int)(parts[2]), parts[3]
-                print(f"💬 Tin nhắn mới từ {src_ip}:{src_port}: {msg}")
-                # key = tuple(sorted([(src_ip, int(src_port)), (my_ip, int(my_port))]))
-                # if key not in history_chat:
-                #     history_chat[key] = []
+                src_ip = parts[1].decode('ascii', 'ignore')
+                src_port = int(parts[2])
+                msg = parts[3].decode('utf-8', 'ignore')
+                logger.debug("💬 Tin nhắn mới từ %s:%s: %s", src_ip, src_port, msg)
+                # key = make_chat_key(src_ip, src_port, my_ip, my_port)
                 # sender_id = f"{src_ip}:{src_port}"
-                # history_chat[key].append({sender_id: msg})
+                # with chat_lock:
+                #     history_chat.setdefault(key, []).append((sender_id, msg))
 
             else:
-                print(f"⚠️ CHAT_MESSAGE bị sai format: {data}")
+                logger.warning("⚠️ CHAT_MESSAGE bị sai format: %s", data)
 
         else:
-            print(f"[Peer] Nội dung khác: {data}")
+            logger.debug("[Peer] Nội dung khác: %s", data)
 
     except Exception as e:
-        print(f"❌ Lỗi xử lý peer message: {e}")
-    finally:
-        conn.close()
+        logger.error("❌ Lỗi xử lý peer message: %s", e)
+
+
+#: 4-byte big-endian length prefix framing every peer-protocol payload;
+#: TCP is a byte stream, so without it messages sharing one pooled
+#: connection would coalesce or split at segment boundaries.
+_FRAME_HDR = struct.Struct("!I")
+
+
+#: (ip, port) -> (long-lived outbound socket, per-socket send lock);
+#: the socket is reused across messages so a chat send costs one sendall
+#: instead of a TCP handshake per message, and the lock keeps two handler
+#: threads from interleaving partial writes inside one frame.
+_conn_pool = {}
+_conn_pool_lock = threading.Lock()
+
+
+def _open_peer_conn(ip, port):
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Nagle would buffer the small chat packets; flush them immediately.
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    # bound connect (and later sends) so an unresponsive peer fails fast
+    s.settimeout(3)
+    s.connect((ip, port))
+    return s
+
+
+def _pool_entry(addr):
+    """Return the pooled (socket, send lock) pair for addr.
+
+    The connect on a miss runs outside _conn_pool_lock so one peer with a
+    dropped SYN can't stall every other sender for the connect timeout;
+    if two threads race the same miss, the loser closes its socket and
+    adopts the winner's entry.
+    """
+    with _conn_pool_lock:
+        entry = _conn_pool.get(addr)
+    if entry is not None:
+        return entry
+    s = _open_peer_conn(*addr)
+    entry = (s, threading.Lock())
+    with _conn_pool_lock:
+        existing = _conn_pool.get(addr)
+        if existing is not None:
+            entry = None
+        else:
+            _conn_pool[addr] = entry
+    if entry is None:
+        try:
+            s.close()
+        except OSError:
+            pass
+        return existing
+    return entry
+
+
+def _send_to_conn(ip, port, payload):
+    """Send payload bytes over the pooled connection to (ip, port).
+
+    A dead pooled socket (peer restarted, idle timeout) is detected by the
+    failed send and replaced with one reconnect attempt before giving up.
+    """
+    addr = (ip, int(port))
+    entry = _pool_entry(addr)
+    s, send_lock = entry
+    try:
+        with send_lock:
+            s.sendall(payload)
+    except OSError:
+        with _conn_pool_lock:
+            if _conn_pool.get(addr) is entry:
+                del _conn_pool[addr]
+        try:
+            s.close()
+        except OSError:
+            pass
+        s, send_lock = _pool_entry(addr)
+        with send_lock:
+            s.sendall(payload)
+
+
+def _send_frame(ip, port, payload):
+    """Length-prefix payload bytes and send them on the pooled connection."""
+    _send_to_conn(ip, port, _FRAME_HDR.pack(len(payload)) + payload)
 
 
 def send_to_peer(ip, port, message):
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((ip, int(port)))
-            s.sendall(message.encode())
+        _send_frame(ip, port, message.encode())
     except Exception as e:
-        print(f"[Error] Cannot send to peer {ip}:{port} - {e}")
+        logger.error("[Error] Cannot send to peer %s:%s - %s", ip, port, e)
 
 def start_peer_listener(my_ip, my_port):
+    """Service every inbound peer socket from one selectors reactor.
+
+    One epoll-backed loop replaces the thread-per-connection model: accepts
+    and reads are dispatched as readiness events, so a message costs a
+    recv instead of an OS thread create/destroy, and client connections
+    stay registered (and reusable by the sender pool) until the peer
+    closes them.
+    """
+    sel = selectors.DefaultSelector()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((my_ip, int(my_port)))
         server_socket.listen()
-        print(f"[Listener] Đang lắng nghe tại {my_ip}:{my_port}")
+        server_socket.setblocking(False)
+        sel.register(server_socket, selectors.EVENT_READ, None)
+        logger.info("[Listener] Đang lắng nghe tại %s:%s", my_ip, my_port)
 
         while True:
-            conn, addr = server_socket.accept()
-            threading.Thread(target=handle_peer_message, args=(conn, addr, my_ip, my_port)).start()
+            for key, _ in sel.select():
+                if key.data is None:
+                    conn, addr = server_socket.accept()
+                    conn.setblocking(False)
+                    # per-connection (addr, receive buffer) for reframing
+                    sel.register(conn, selectors.EVENT_READ, (addr, bytearray()))
+                    continue
+
+                conn, (addr, buf) = key.fileobj, key.data
+                try:
+                    data = conn.recv(4096)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b''
+                if not data:
+                    sel.unregister(conn)
+                    conn.close()
+                    continue
+                buf += data
+                # drain every complete frame buffered so far
+                while len(buf) >= _FRAME_HDR.size:
+                    (frame_len,) = _FRAME_HDR.unpack_from(buf)
+                    end = _FRAME_HDR.size + frame_len
+                    if len(buf) < end:
+                        break
+                    payload = bytes(buf[_FRAME_HDR.size:end])
+                    del buf[:end]
+                    _process_peer_payload(payload, addr, my_ip, my_port)
 
 def send_to_peer_message(src_ip, src_port, target_ip, target_port, msg):
     try:
         packet = f"CHAT_MESSAGE|{src_ip}|{src_port}|{msg}"
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((target_ip, int(target_port)))
-            s.sendall(packet.encode("utf-8"))
+        _send_frame(target_ip, target_port, packet.encode("utf-8"))
         # lưu lịch sử
-        key = tuple(sorted([(src_ip, int(src_port)), (target_ip, int(target_port))]))
-        if key not in history_chat:
-            history_chat[key] = []
+        key = make_chat_key(src_ip, src_port, target_ip, target_port)
         sender_id = f"{src_ip}:{src_port}"
-        history_chat[key].append({sender_id: msg})
-        print(f"✅ Gửi tin nhắn tới {target_ip}:{target_port} → {msg}")
+        with chat_lock:
+            # mỗi tin nhắn là một tuple (sender, msg) — không cấp phát dict
+            history_chat.setdefault(key, []).append((sender_id, msg))
+        logger.debug("✅ Gửi tin nhắn tới %s:%s → %s", target_ip, target_port, msg)
     except Exception as e:
-        print(f"❌ Lỗi gửi tin tới {target_ip}:{target_port}: {e}")
+        logger.error("❌ Lỗi gửi tin tới %s:%s: %s", target_ip, target_port, e)
+
+@functools.lru_cache(maxsize=1024)
+def make_chat_key(src_ip, src_port, target_ip, target_port):
+    """Tạo key dạng ipA:portA|ipB:portB, đảm bảo thứ tự cố định.
+
+    Cached per peer pair, so the int casts, the sort and the string
+    formatting run once per conversation instead of on every message.
+    """
+    peers = sorted([(src_ip, int(src_port)), (target_ip, int(target_port))])
+    return f"{peers[0][0]}:{peers[0][1]}|{peers[1][0]}:{peers[1][1]}"
+
+def _params(request, *names):
+    """Fetch several form fields from a request body in one go.
+
+    :params request (class:`Request <Request>`): incoming request object.
+    :params names (str): field names to extract.
+
+    :rtype tuple: one value per name, None where the field is absent.
+    """
+    params = request.body
+    # Non-form POSTs (json, multipart, ...) keep the raw bytes in body;
+    # handlers see every field as absent instead of crashing on .get.
+    if not isinstance(params, dict):
+        return (None,) * len(names)
+    get = params.get
+    return tuple(get(name) for name in names)
 
-def make_chat_key(peer1, peer2):
-    """Tạo key dạng ipA:portA|ipB:portB, đảm bảo thứ tự cố định"""
-    peers = sorted([peer1, peer2])
-    return f"{peers[0]}|{peers[1]}"
 
 class Response():   
 
@@ -154,6 +485,13 @@ class Response():
         self._content_consumed = False
         self._next = None
 
+        #: Content length override when the body is not held in _content.
+        self._content_length = None
+
+        #: (filepath, size) when the body should be streamed from a file
+        #: by :meth:`send` instead of being loaded into memory.
+        self._sendfile = None
+
         #: Integer Code of responded HTTP Status, e.g. 404 or 200.
         self.status_code = None
 
@@ -187,46 +525,15 @@ class Response():
 
 
     def get_mime_type(self, path):
-        
-        try:
-            mime_type, _ = mimetypes.guess_type(path)
-        except Exception:
-            return 'application/octet-stream'
-        return mime_type or 'application/octet-stream'
+        return _guess_mime(os.path.splitext(path)[1])
 
 
     def prepare_content_type(self, mime_type='text/html'):
-        base_dir = ""
-        main_type, sub_type = mime_type.split('/', 1)
         self.headers['Content-Type'] = mime_type
-        #print("[Response] processing MIME main_type={} sub_type={}".format(main_type,sub_type))
-        if main_type == 'text':
-            if sub_type == 'plain' or sub_type == 'css':
-                base_dir = BASE_DIR+"static/"
-            elif sub_type == 'html':
-                base_dir = BASE_DIR+"www/"
-            else:
-                raise ValueError("Invalid MEME type: main_type={} sub_type={}".format(main_type,sub_type))
-        elif main_type == 'image':
-            if sub_type in ['png', 'jpeg', 'vnd.microsoft.icon', 'x-icon']:
-                base_dir = BASE_DIR+"static/images/"
-            else:
-                raise ValueError(f"Unsupported image subtype: {sub_type}")
-        elif main_type == 'application':
-            if sub_type == 'x-x509-ca-cert':
-                base_dir = BASE_DIR+"cert/"
-            elif sub_type == 'javascript':
-                base_dir = BASE_DIR+"static/js/"
-            elif sub_type == 'python':
-                base_dir = BASE_DIR+"apps/"
-            else:
-                raise ValueError(f"Unsupported application subtype: {sub_type}")
-        elif main_type == 'video':
-            if sub_type == 'mp4':
-                base_dir = BASE_DIR + ""
-            raise ValueError(f"Unsupported video subtype: {sub_type}")
-        else: raise ValueError(f"Unsupported main MIME type: {main_type}")
-        return base_dir
+        try:
+            return _MIME_BASE[mime_type]
+        except KeyError:
+            raise ValueError(f"Unsupported MIME type: {mime_type}")
 
 
     def build_content(self, path, base_dir):
@@ -239,20 +546,30 @@ class Response():
         :rtype tuple: (int, bytes) representing content length and content data.
         """
 
-        filepath = os.path.join(base_dir, path.lstrip('/'))
+        filepath = _resolve_path(base_dir, path)
+        if filepath is None:
+            logger.warning("[Response] Path escapes base dir: %s", path)
+            self.status_code = 404
+            return (len(b"404"), b"404")
 
-        print("[Response] serving the object at location {}".format(filepath))
+        logger.debug("[Response] serving the object at location %s", filepath)
         # hiện thực lấy dữ liệu trả về (len(content) và content)
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read().encode('utf-8')
+            # Binary read — the files are served as-is, so there is no need
+            # to decode to str and re-encode back to UTF-8 bytes.
+            st = os.stat(filepath)
+            if st.st_size < _FILE_CACHE_MAX_BYTES:
+                content = _load_bytes(filepath, st.st_mtime)
+            else:
+                with open(filepath, 'rb') as f:
+                    content = f.read()
             return (len(content), content)
         except FileNotFoundError:
-            print("[Response] File not found: {}".format(filepath))
+            logger.warning("[Response] File not found: %s", filepath)
             self.status_code = 404
             return (len(b"404"),b"404")
         except Exception as e:
-            print("[Response] Server error {}: {}".format(filepath, e))
+            logger.error("[Response] Server error %s: %s", filepath, e)
             self.status_code = 500
             return (len(b"500"),b"500")
 
@@ -268,42 +585,22 @@ class Response():
         :rtypes bytes: encoded HTTP response header.
         """
         reqhdr = request.headers
-        rsphdr = self.headers
-
-        # Build dynamic headers
-        headers = {
-                "Accept": "{}".format(reqhdr.get("Accept", "application/json")),
-                "Accept-Language": "{}".format(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
-                "Authorization": "{}".format(reqhdr.get("Authorization", "Basic <credentials>")),
-                "Cache-Control": "no-cache",
-                "Content-Type": "{}".format(self.headers['Content-Type']),
-                "Content-Length": "{}".format(len(self._content)),
-                # "Cookie": "{}".format(reqhdr.get("Cookie", "sessionid=xyz789")), #dummy cooki
-        #
-        # TODO prepare the request authentication
-        #
-        # self.auth = ...
-                "Date": "{}".format(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
-                "Max-Forward": "10",
-                "Pragma": "no-cache",
-                "Proxy-Authorization": "Basic dXNlcjpwYXNz",  # example base64
-                "Warning": "199 Miscellaneous warning",
-                "User-Agent": "{}".format(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
-        }
-
-        # Header text alignment
-        #
-        #  TODO: implement the header building to create formatted
-        #        header from the provided headers
-        #  DONE
-        lines = ['{}: {}'.format(k, v) for k, v in headers.items()]
-        fmt_header = '\r\n'.join(lines)
-        
+
+        # Substitute only the dynamic fields into the pre-encoded template;
+        # the constant header lines were encoded once at import time.
         #
         # TODO prepare the request authentication
         #
         # self.auth = ...
-        return str(fmt_header).encode('utf-8')
+        return _RESPONSE_HDR_TEMPLATE % (
+            reqhdr.get("accept", "application/json").encode('utf-8'),
+            reqhdr.get("accept-language", "en-US,en;q=0.9").encode('utf-8'),
+            reqhdr.get("authorization", "Basic <credentials>").encode('utf-8'),
+            self.headers['Content-Type'].encode('utf-8'),
+            self._content_length if self._content_length is not None else len(self._content),
+            _http_date(),
+            reqhdr.get("user-agent", "Chrome/123.0.0.0").encode('utf-8'),
+        )
 
 
     def build_notfound(self):
@@ -313,17 +610,228 @@ class Response():
         :rtype bytes: Encoded 404 response.
         """
 
-        return (
-                "HTTP/1.1 404 Not Found\r\n"
-                "Accept-Ranges: bytes\r\n"
-                "Content-Type: text/html\r\n"
-                "Content-Length: 13\r\n"
-                "Cache-Control: max-age=86000\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-                "404 Not Found"
-            ).encode('utf-8')
+        return _NOTFOUND
+
+
+    # ========== TASK 1A: Handle POST /login ==========
+    def _handle_login(self, request):
+        # Parse form data from request body
+        username, password = _params(request, "username", "password")
+
+        # Validate credentials
+        if username == "admin" and password == "password":
+            # CREATE SESSION
+            session = session_manager.create_session(username)
+            logger.debug("[Response] '%s' login SUCCESSFUL - Session ID: %s", username, session.session_id)
+
+            base_dir = self.prepare_content_type("text/html")
+            _, content = self.build_content("/dashboard.html", base_dir)
+
+            # Create session cookie
+            session_cookie = create_session_cookie(session.session_id, max_age=120)
+
+            return _build_page(_HDR_200_HTML, content, cookie=session_cookie)
+        else:
+            logger.debug("[Response] '%s' login FAILED - Invalid credentials", username)
+            base_dir = self.prepare_content_type("text/html")
+            _, content = self.build_content("/login.html", base_dir)
 
+            return _build_page(_HDR_401_HTML, content)
+
+    # ========== TASK 1B: Handle GET / or /index.html ==========
+    def _handle_index(self, request):
+        cookie_header = request.headers.get('cookie', '')
+        session_info = parse_session_cookie(cookie_header)
+        session_id = session_info.get('session_id')
+
+        # Validate session
+        session = session_manager.get_session(session_id)
+
+        if session:
+            logger.debug("[Response] Valid session %s for user '%s' - Serving dashboard",
+                         session_id, session.username)
+            base_dir = self.prepare_content_type("text/html")
+            _, content = self.build_content("/dashboard.html", base_dir)
+
+            return _build_page(_HDR_200_HTML, content)
+        else:
+            logger.debug("[Response] No valid session - Returning login page")
+            base_dir = self.prepare_content_type("text/html")
+            _, content = self.build_content("/login.html", base_dir)
+
+            return _build_page(_HDR_401_HTML, content)
+
+    # Logout endpoint
+    def _handle_logout(self, request):
+        cookie_header = request.headers.get('cookie', '')
+        session_info = parse_session_cookie(cookie_header)
+        session_id = session_info.get('session_id')
+
+        if session_id:
+            session_manager.destroy_session(session_id)
+
+        logout_cookie = create_logout_cookie()
+        base_dir = self.prepare_content_type("text/html")
+        _, content = self.build_content("/login.html", base_dir)
+
+        return _build_page(_HDR_200_HTML, content, cookie=logout_cookie)
+
+    # ======= START TASK 2 ======= #
+    # ========== Handle POST /submit-info ==========
+    def _handle_submit_info(self, request):
+        ip, port = _params(request, "ip", "port")
+        ip = ip or "127.0.0.1"
+        port = port or "9001"
+
+        logger.debug("[Submit] Peer info received: %s:%s", ip, port)
+        # check-then-add phải là một thao tác nguyên tử giữa các luồng
+        with peers_lock:
+            is_new = (ip, port) not in peer_list
+            # ghi lại last-seen; peer cũ chỉ cập nhật timestamp
+            peer_list[(ip, port)] = time.time()
+            if is_new:
+                relogin = f"{ip}:{port}" in connections
+                if not relogin:
+                    t = threading.Thread(target=start_peer_listener, args=(ip, port), daemon=True)
+                    peer_sockets[(ip, port)] = t
+        if is_new:
+            logger.debug("[SubmitInfo] New peer registered: %s:%s", ip, port)
+            # mở luồng nghe request từ peer khác
+            if relogin:
+                logger.debug("[SubmitInfo] Re-Login for peer %s:%s", ip, port)
+            else:
+                t.start()
+        else:
+            logger.debug("[SubmitInfo] Peer already registered: %s:%s", ip, port)
+        response_body = f"Received peer info: {ip}:{port}".encode("utf-8")
+
+        return _build_page(_HDR_200_TEXT, response_body)
+
+    def _handle_add_list(self, request):
+        (src_ip, src_port,
+         target_ip, target_port) = _params(request, "source_ip", "source_port",
+                                           "target_ip", "target_port")
+        if not all([src_ip, src_port, target_ip, target_port]):
+            msg = "Missing ip or port field".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+        try:
+            add_connection(src_ip,src_port,target_ip,target_port)
+
+            msg = f"Đã thêm peer vào danh sách kết nối".encode("utf-8")
+            return _build_page(_HDR_200_TEXT, msg)
+
+        except Exception as e:
+            logger.error("Lỗi khi kết nối tới %s:%s → %s", target_ip, target_port, e)
+            return self.build_notfound()
+
+    def _handle_get_total_peer(self, request):
+        with peers_lock:
+            peers = sorted(peer_list)
+        if not peers:
+            content = "No peers registered.".encode("utf-8")
+        else:
+            content = "\n".join([f"{ip}:{port}" for ip, port in peers]).encode("utf-8")
+
+        return _build_page(_HDR_200_TEXT, content)
+
+    def _handle_get_list(self, request):
+        ip, port = _params(request, "ip", "port")
+        if not ip or not port:
+            msg = "Missing ip or port field".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+
+        with peers_lock:
+            connected = list(connections.get(f"{ip}:{port}", set()))
+        content = "\n".join(connected).encode("utf-8")
+
+        return _build_page(_HDR_200_TEXT, content)
+
+    ## kết nối đến peer / direct peer communicate
+    def _handle_connect_peer(self, request):
+        (src_ip, src_port,
+         target_ip, target_port) = _params(request, "source_ip", "source_port",
+                                           "target_ip", "target_port")
+
+        if not all([src_ip, src_port, target_ip, target_port]):
+            msg = "Missing ip or port field".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+
+        try:
+            # Gửi yêu cầu kết nối đến peer đích (framed, qua pool như mọi sender khác)
+            _send_frame(target_ip, target_port,
+                        f"CONNECT_REQUEST {src_ip}:{src_port}".encode("utf-8"))
+            logger.debug("✅ Gửi CONNECT_REQUEST từ %s:%s đến %s:%s", src_ip, src_port, target_ip, target_port)
+
+            msg = f"Kết nối P2P giữa {src_ip}:{src_port} ↔ {target_ip}:{target_port} đã được thiết lập.".encode("utf-8")
+            return _build_page(_HDR_200_TEXT, msg)
+
+        except Exception as e:
+            logger.error("Lỗi khi kết nối tới %s:%s → %s", target_ip, target_port, e)
+            return self.build_notfound()
+
+    def _handle_broadcast_peer(self, request):
+        ip, port, message = _params(request, "ip", "port", "message")
+
+        if not all([ip,port, message]):
+            msg = "Missing required fields".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+        # chỉ unquote sau khi chắc chắn message tồn tại
+        message = unquote_plus(message)
+        with peers_lock:
+            connected_set = list(connections.get(f"{ip}:{port}", set()))
+        for target in connected_set:
+            target_ip, target_port = target.split(":")
+            send_to_peer_message(ip, port, target_ip, target_port, message)
+        body = f"Sent from {ip}:{port}".encode("utf-8")
+        return _build_page(_HDR_200_TEXT, body)
+
+    def _handle_send_peer(self, request):
+        (src_ip, src_port, target_ip,
+         target_port, message) = _params(request, "source_ip", "source_port",
+                                         "ip", "port", "message")
+
+        if not all([src_ip, src_port, target_ip, target_port, message]):
+            msg = "Missing required fields".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+        # chỉ unquote sau khi chắc chắn message tồn tại
+        message = unquote_plus(message)
+
+        send_to_peer_message(src_ip, src_port, target_ip, target_port, message)
+
+        body = f"Sent from {src_ip}:{src_port} to {target_ip}:{target_port}".encode("utf-8")
+        return _build_page(_HDR_200_TEXT, body)
+
+    def _handle_get_messages(self, request):
+        (src_ip, src_port,
+         target_ip, target_port) = _params(request, "src_ip", "src_port",
+                                           "target_ip", "target_port")
+        if not all([src_ip, src_port, target_ip, target_port]):
+            msg = "Missing fields".encode("utf-8")
+            return _build_page(_HDR_400_TEXT, msg)
+
+        key = make_chat_key(src_ip, src_port, target_ip, target_port)
+        with chat_lock:
+            chat = list(history_chat.get(key, ()))
+
+        local_id = f"{src_ip}:{int(src_port)}"
+        peer_id = f"{target_ip}:{int(target_port)}"
+        lines = [f"{sender}|{msg}" for sender, msg in chat
+                 if sender == local_id or sender == peer_id]
+
+        resp_body = "\n".join(lines).encode("utf-8")
+        return _build_page(_HDR_200_TEXT, resp_body)
+
+    # cái này để cập nhật peer_list khi có peer rời
+    def _handle_remove_peer(self, request):
+        ip, port = _params(request, "ip", "port")
+        # để xóa peer_list
+        peer = (ip,port)
+        # ko cần xóa khỏi connections
+        with peers_lock:
+            peer_list.pop(peer, None)
+        resp_body = "1 peer đã thoát".encode("utf-8")
+        logger.debug("Cập nhật lại danh sách peer hoạt động")
+        return _build_page(_HDR_200_TEXT, resp_body)
 
     def build_response(self, request):
         """
@@ -336,361 +844,98 @@ class Response():
         path = request.path
         if not path:
             return self.build_notfound()
-        method = request.method
-
-        # ========== TASK 1A: Handle POST /login ==========
-        if path == "/login" and method == "POST":
-            # Parse form data from request body
-            params = request.body or {}            
-            username = params.get("username", "")
-            password = params.get("password", "")
-            
-            # Validate credentials
-            if username == "admin" and password == "password":
-                # CREATE SESSION
-                session = session_manager.create_session(username)
-                print("[Response] '{}' login SUCCESSFUL - Session ID: {}".format(username, session.session_id))
-                
-                base_dir = self.prepare_content_type("text/html")
-                _, content = self.build_content("/dashboard.html", base_dir)
-                
-                # Create session cookie
-                session_cookie = create_session_cookie(session.session_id, max_age=120)
-                
-                response = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: text/html; charset=utf-8\r\n"
-                    f"Set-Cookie: {session_cookie}\r\n"
-                    f"Content-Length: {len(content)}\r\n"
-                    "Connection: close\r\n"
-                    "\r\n"
-                ).encode("utf-8") + content
-                return response
-            else:
-                print("[Response] '{}' login FAILED - Invalid credentials".format(username))
-                base_dir = self.prepare_content_type("text/html")
-                _, content = self.build_content("/login.html", base_dir)
-                
-                response = (
-                    "HTTP/1.1 401 Unauthorized\r\n"
-                    "Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(content)}\r\n"
-                    "Connection: close\r\n"
-                    "\r\n"
-                ).encode("utf-8") + content
-                return response
-    
-        # ========== TASK 1B: Handle GET / or /index.html ==========
-        elif path in ["/", "/index.html"] and method == "GET":
-            cookie_header = request.headers.get('Cookie', '')
-            session_info = parse_session_cookie(cookie_header)
-            session_id = session_info.get('session_id')
-            
-            # Validate session
-            session = session_manager.get_session(session_id)
-            
-            if session:
-                print("[Response] Valid session {} for user '{}' - Serving dashboard".format(
-                    session_id, session.username))
-                base_dir = self.prepare_content_type("text/html")
-                _, content = self.build_content("/dashboard.html", base_dir)
-                
-                response = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(content)}\r\n"
-                    "Connection: close\r\n"
-                    "\r\n"
-                ).encode("utf-8") + content
-                return response
-            else:
-                print("[Response] No valid session - Returning login page")
-                base_dir = self.prepare_content_type("text/html")
-                _, content = self.build_content("/login.html", base_dir)
-                
-                response = (
-                    "HTTP/1.1 401 Unauthorized\r\n"
-                    "Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(content)}\r\n"
-                    "Connection: close\r\n"
-                    "\r\n"
-                ).encode("utf-8") + content
-                return response
-        
-        # Logout endpoint
-        elif path == "/logout" and method == "POST":
-            cookie_header = request.headers.get('Cookie', '')
-            session_info = parse_session_cookie(cookie_header)
-            session_id = session_info.get('session_id')
-            
-            if session_id:
-                session_manager.destroy_session(session_id)
-            
-            logout_cookie = create_logout_cookie()
-            base_dir = self.prepare_content_type("text/html")
-            _, content = self.build_content("/login.html", base_dir)
-            
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/html; charset=utf-8\r\n"
-                "Set-Cookie: {}\r\n"
-                "Content-Length: {}\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-            ).format(logout_cookie, len(content)).encode("utf-8") + content
-            return response
-
-        # ======= START TASK 2 ======= #
-        # ========== Handle POST /submit-info ==========
-        elif path == "/submit-info" and method == "POST":
-            params = request.body or {}
-            ip = params.get("ip", "127.0.0.1")
-            port = params.get("port", "9001")
-
-            print(f"[Submit] Peer info received: {ip}:{port}")
-            if (ip, port) not in peer_list:
-                peer_list.append((ip, port))
-                print(f"[SubmitInfo] New peer registered: {ip}:{port}")
-                # mở luồng nghe request từ peer khác
-                if f"{ip}:{port}" in connections:
-                    print(f"[SubmitInfo] Re-Login for peer {ip}:{port}")
-                else:
-                    t = threading.Thread(target=start_peer_listener, args=(ip, port), daemon=True)
-                    t.start()
-                    peer_sockets[(ip, port)] = t
-            else:
-                print(f"[SubmitInfo] Peer already registered: {ip}:{port}")
-            response_body = f"Received peer info: {ip}:{port}".encode("utf-8")
-
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain; charset=utf-8\r\n"
-                f"Content-Length: {len(response_body)}\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-            ).encode("utf-8") + response_body
-            return response
-        elif path == "/add-list" and method == "POST":
-            params = request.body or {}
-            src_ip = params.get("source_ip")
-            src_port = params.get("source_port")
-            target_ip = params.get("target_ip", "")
-            target_port = params.get("target_port","")
-            if not all([src_ip, src_port, target_ip, target_port]):
-                msg = "Missing ip or port field".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Connection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-            try:
-                add_connection(src_ip,src_port,target_ip,target_port)
 
-                msg = f"Đã thêm peer vào danh sách kết nối".encode("utf-8")
-                response = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Connection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-                return response
+        handler = self._ROUTES.get((request.method, path))
+        if handler is not None:
+            return handler(self, request)
 
-            except Exception as e:
-                err = f"Lỗi khi kết nối tới {target_ip}:{target_port} → {e}".encode("utf-8")
-                print(err)
-                return self.build_notfound()
-        elif path == "/get-total-peer" and method == "GET":
-            if not peer_list:
-                content = "No peers registered.".encode("utf-8")
-            else:
-                content = "\n".join([f"{ip}:{port}" for ip, port in peer_list]).encode("utf-8")
-            
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain\r\n"
-                f"Content-Length: {len(content)}\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-            ).encode("utf-8") + content
-
-            return response
-        elif path == "/get-list" and method == "POST":
-            params = request.body or {}
-            ip = params.get("ip")
-            port = params.get("port")
-            if not ip or not port:
-                msg = "Missing ip or port field".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Connection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-            
-            content = "\n".join([f"{connect_peer}" for connect_peer in connections.get(f"{ip}:{port}",set())]).encode("utf-8")
-            
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain\r\n"
-                f"Content-Length: {len(content)}\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-            ).encode("utf-8") + content
-            return response
-        ## kết nối đến peer / direct peer communicate
-        elif path == "/connect-peer" and method == "POST":
-            params = request.body or {}
-            src_ip = params.get("source_ip")
-            src_port = params.get("source_port")
-            target_ip = params.get("target_ip", "")
-            target_port = params.get("target_port","")
-
-            if not all([src_ip, src_port, target_ip, target_port]):
-                msg = "Missing ip or port field".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Connection: close\r\n\r\n"
-                ).encode("utf-8") + msg
+        return self._serve_static(request)
 
-            try:
-                # Gửi yêu cầu kết nối đến peer đích
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(3)
-                s.connect((target_ip, int(target_port)))
-                s.sendall(f"CONNECT_REQUEST {src_ip}:{src_port}".encode("utf-8"))
-                print(f"✅ Gửi CONNECT_REQUEST từ {src_ip}:{src_port} đến {target_ip}:{target_port}")
-                s.close()
-
-                msg = f"Kết nối P2P giữa {src_ip}:{src_port} ↔ {target_ip}:{target_port} đã được thiết lập.".encode("utf-8")
-                response = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Connection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-                return response
+    def _serve_static(self, request):
+        """Serve a static file for paths with no routed handler.
 
-            except Exception as e:
-                err = f"Lỗi khi kết nối tới {target_ip}:{target_port} → {e}".encode("utf-8")
-                print(err)
-                return self.build_notfound()
-        elif path == "/broadcast-peer" and method == "POST":
-            params = request.body or {}
-            ip = params.get("ip")
-            port = params.get("port")
-            message = unquote_plus(params.get("message"))
-
-            if not all([ip,port, message]):
-                msg = "Missing required fields".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\nConnection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-            connected_set = connections.get(f"{ip}:{port}", set())
-            for target in connected_set:
-                target_ip, target_port = target.split(":")
-                send_to_peer_message(ip, port, target_ip, target_port, message)
-            body = f"Sent from {ip}:{port}".encode("utf-8")
-            return (
-                "HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n"
-                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
-            ).encode("utf-8") + body
-        elif path == "/send-peer" and method == "POST":
-            params = request.body or {}
-            src_ip = params.get("source_ip")
-            src_port = params.get("source_port")
-            target_ip = params.get("ip")
-            target_port = params.get("port")
-            message = unquote_plus(params.get("message"))
-
-            if not all([src_ip, src_port, target_ip, target_port, message]):
-                msg = "Missing required fields".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    "Content-Type: text/plain\r\n"
-                    f"Content-Length: {len(msg)}\r\nConnection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-
-            send_to_peer_message(src_ip, src_port, target_ip, target_port, message)
-
-            body = f"Sent from {src_ip}:{src_port} to {target_ip}:{target_port}".encode("utf-8")
-            return (
-                "HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n"
-                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
-            ).encode("utf-8") + body
-        elif path == "/get-messages" and method == "POST":
-            params = request.body or {}
-            src_ip = params.get("src_ip","")
-            src_port = params.get("src_port","")
-            target_ip = params.get("target_ip","")
-            target_port = params.get("target_port","")
-            if not all([src_ip, src_port, target_ip, target_port]):
-                msg = "Missing fields".encode("utf-8")
-                return (
-                    "HTTP/1.1 400 Bad Request\r\n"
-                    f"Content-Length: {len(msg)}\r\n"
-                    "Content-Type: text/plain\r\nConnection: close\r\n\r\n"
-                ).encode("utf-8") + msg
-
-            key = tuple(sorted([(src_ip, int(src_port)), (target_ip, int(target_port))]))
-            chat = history_chat.get(key, [])
-
-            lines = []
-            local_id = f"{src_ip}:{int(src_port)}"
-            peer_id = f"{target_ip}:{int(target_port)}"
-            for msg_dict in chat:
-                for sender, msg in msg_dict.items():
-                    if sender == local_id or sender == peer_id:
-                        lines.append(f"{sender}|{msg}")
-            
-            resp_body = "\n".join(lines).encode("utf-8")
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain; charset=utf-8\r\n"
-                f"Content-Length: {len(resp_body)}\r\n"
-                "Connection: close\r\n\r\n"
-            ).encode("utf-8") + resp_body
-            return response
-        elif path== "/remove-peer":
-            params = request.body or {}
-            ip = params.get("ip","")
-            port = params.get("port","")
-            # để xóa peer_list
-            peer = (ip,port)
-            # ko cần xóa khỏi connections
-            if peer in peer_list:
-                peer_list.remove(peer)
-            resp_body = "1 peer đã thoát".encode("utf-8")
-            print("Cập nhật lại danh sách peer hoạt động")
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                "Content-Type: text/plain; charset=utf-8\r\n"
-                f"Content-Length: {len(resp_body)}\r\n"
-                "Connection: close\r\n\r\n"
-            ).encode("utf-8") + resp_body
-            return response
-        mime_type = self.get_mime_type(path)
-        print("[Response] {} path {} mime_type {}".format(request.method, request.path, mime_type))
-
-
-        base_dir = ""
-
-        # If HTML, parse and serve embedded objects
-        if path.endswith('.html') or mime_type == 'text/html':
-            base_dir = self.prepare_content_type(mime_type='text/html')
-        elif mime_type == 'text/css':
-            base_dir = self.prepare_content_type(mime_type='text/css')
-        #
-        # TODO: add support objects
-        #
-        else:
+        Only builds the header; the body is streamed straight from the
+        page cache by :meth:`send` via sendfile.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: response header for the streamed file, or a 404 page.
+        """
+        path = request.path
+        info = _EXT_INFO.get(os.path.splitext(path)[1].lower())
+        if info is None:
+            return self.build_notfound()
+
+        mime_type, base_dir = info
+        logger.debug("[Response] %s path %s mime_type %s", request.method, request.path, mime_type)
+        self.headers['Content-Type'] = mime_type
+
+        filepath = _resolve_path(base_dir, path)
+        if filepath is None:
+            logger.warning("[Response] Path escapes base dir: %s", path)
+            self.status_code = 404
+            return self.build_notfound()
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            logger.warning("[Response] File not found: %s", filepath)
+            self.status_code = 404
             return self.build_notfound()
 
-        c_len, self._content = self.build_content(path, base_dir)
+        self._content = b''
+        self._content_length = size
+        self._sendfile = (filepath, size)
         self._header = self.build_response_header(request)
 
-        return self._header + self._content
\ No newline at end of file
+        return self._header
+
+
+    #: Dispatch table mapping (method, path) to its handler, built once at
+    #: class creation; request dispatch is a single dict lookup instead of
+    #: walking the former if/elif cascade of string compares.
+    _ROUTES = {
+        ("POST", "/login"): _handle_login,
+        ("GET", "/"): _handle_index,
+        ("GET", "/index.html"): _handle_index,
+        ("POST", "/logout"): _handle_logout,
+        ("POST", "/submit-info"): _handle_submit_info,
+        ("POST", "/add-list"): _handle_add_list,
+        ("GET", "/get-total-peer"): _handle_get_total_peer,
+        ("POST", "/get-list"): _handle_get_list,
+        ("POST", "/connect-peer"): _handle_connect_peer,
+        ("POST", "/broadcast-peer"): _handle_broadcast_peer,
+        ("POST", "/send-peer"): _handle_send_peer,
+        ("POST", "/get-messages"): _handle_get_messages,
+        ("POST", "/remove-peer"): _handle_remove_peer,
+        ("GET", "/remove-peer"): _handle_remove_peer,
+    }
+
+    def send(self, sock, response):
+        """
+        Sends a built response on the client socket.
+
+        Dynamic responses are written as-is; scatter lists from
+        _build_page go out through one gathered sendmsg call without being
+        concatenated first, and static file bodies are streamed with
+        zero-copy os.sendfile after the header.
+
+        :params sock (socket.socket): the client connection.
+        :params response (bytes or list): the value from build_response.
+        """
+        if isinstance(response, list):
+            sent = sock.sendmsg(response)
+            total = sum(len(p) for p in response)
+            if sent < total:
+                # Short gathered write (small socket buffer); flush the
+                # remainder the plain way.
+                sock.sendall(b"".join(response)[sent:])
+        else:
+            sock.sendall(response)
+
+        if self._sendfile:
+            filepath, size = self._sendfile
+            with open(filepath, 'rb') as f:
+                # socket.sendfile drives os.sendfile itself (retrying short
+                # writes, falling back to a read/send loop where the syscall
+                # is unavailable), so the body never crosses userspace here.
+                sock.sendfile(f, count=size)
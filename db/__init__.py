@@ -1,13 +1,23 @@
-# đường dẫn db/__init__.py
-# Khởi tạo danh sách lưu các peer kết nối
-peer_list = []
-active_peers = []
-connections = {}
-chat_history = {}  # ánh xạ cặp peer -> list message
-pending_requests = []  # chứa các yêu cầu chờ xác nhận
-history_chat = {}     # { "ipA:portA|ipB:portB" : [ { "sender": "...", "msg": "..." }, ..
-
-from .session import (
-    Session,
-    SessionManager,
+# đường dẫn db/__init__.py
+import threading
+
+# Khởi tạo danh sách lưu các peer kết nối
+# dict (ip, port) -> last-seen timestamp — membership, insert và remove
+# đều O(1), và timestamp cho biết peer còn hoạt động hay không
+peer_list = {}
+
+#: Guards peer_list / connections / peer_sockets; mutations come from many
+#: listener threads, so check-then-update sequences must hold this lock.
+peers_lock = threading.RLock()
+#: Guards history_chat appends and reads.
+chat_lock = threading.RLock()
+active_peers = []
+connections = {}
+chat_history = {}  # ánh xạ cặp peer -> list message
+pending_requests = []  # chứa các yêu cầu chờ xác nhận
+history_chat = {}     # key cặp peer -> [ (sender, msg), ... ] — tuple thay dict mỗi tin nhắn
+
+from .session import (
+    Session,
+    SessionManager,
 )
\ No newline at end of file
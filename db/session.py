@@ -3,31 +3,66 @@ Database-backed session storage using SQLite.
 Thread-safe and supports multiple backend processes.
 """
 
-import uuid
+import re
+import json
 import time
+import atexit
+import secrets
 import sqlite3
+import logging
 import threading
+from collections import deque
 from contextlib import contextmanager
 
+logger = logging.getLogger(__name__)
+
 DB_PATH = "db/sessions.db"
 
+#: SQL statements, defined once so each call reuses the same string object
+#: and SQLite can serve the prepared statement from its per-connection
+#: statement cache instead of re-parsing the text.
+_SQL_FLUSH = '''
+    INSERT OR REPLACE INTO sessions
+    (session_id, username, created_at, last_accessed, expires_at, data)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+_SQL_LOAD = '''
+    SELECT session_id, username, created_at, last_accessed, expires_at, data
+    FROM sessions WHERE expires_at > ?
+'''
+_SQL_DELETE = 'DELETE FROM sessions WHERE session_id = ?'
+_SQL_CLEANUP = '''
+    DELETE FROM sessions WHERE session_id IN (
+        SELECT session_id FROM sessions WHERE expires_at < ? LIMIT ?
+    )
+'''
+
+#: Alphabet of a token_urlsafe session id; anything else is scanner junk.
+_SID_RE = re.compile(r'[A-Za-z0-9_-]+')
+
 class Session:
     """Represents a user session with authentication state and metadata."""
     
-    def __init__(self, session_id, username, timeout=3600):
+    def __init__(self, session_id, username, timeout=3600, now=None):
+        if now is None:
+            now = time.time()
         self.session_id = session_id
         self.username = username
-        self.created_at = time.time()
-        self.last_accessed = time.time()
-        self.expires_at = self.created_at + timeout
+        self.created_at = now
+        self.last_accessed = now
+        self.expires_at = now + timeout
         self.data = {}
-    
+
     def is_expired(self):
         return time.time() > self.expires_at
-    
-    def touch(self, timeout=3600):
-        """Update last accessed time and extend expiration."""
-        self.last_accessed = time.time()
+
+    def touch(self, timeout=3600, now=None):
+        """Update last accessed time and extend expiration.
+
+        Callers that already hold a timestamp pass it as ``now`` so the
+        clock is read once per request instead of once per method.
+        """
+        self.last_accessed = time.time() if now is None else now
         self.expires_at = self.last_accessed + timeout
     
     def get(self, key, default=None):
@@ -41,21 +76,193 @@ class Session:
     def __repr__(self):
         return f"Session(id={self.session_id}, username={self.username}, created_at={self.created_at}, last_accessed={self.last_accessed}, expires_at={self.expires_at}, data={self.data})"
 
+class _ConnectionPool:
+    """Small thread-safe pool of SQLite connections.
+
+    Connections are handed out with acquire-on-enter / release-on-exit
+    semantics: a borrower pops an idle connection (or opens one while the
+    pool is below max_size), and waits on the condition when the pool is
+    exhausted. close_all() makes the leak explicit at shutdown instead of
+    relying on dying threads to drop their thread-local handles.
+    """
+
+    def __init__(self, db_path, max_size=4):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._open_count = 0
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=10.0
+        )
+        # C-level busy handler instead of Python-level retries when
+        # another thread holds the write lock.
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = None
+        with self._cond:
+            while conn is None:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.popleft()
+                elif self._open_count < self.max_size:
+                    self._open_count += 1
+                    break
+                else:
+                    self._cond.wait()
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                # give the reserved slot back, or the pool's capacity
+                # shrinks for good and waiters block forever
+                with self._cond:
+                    self._open_count -= 1
+                    self._cond.notify()
+                raise
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            with self._cond:
+                if self._closed:
+                    conn.close()
+                    self._open_count -= 1
+                else:
+                    self._idle.append(conn)
+                    self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.popleft().close()
+                self._open_count -= 1
+            self._cond.notify_all()
+
+
+
 class SessionManager:
     """Session manager with SQLite persistence."""
     
+    #: Minimum seconds between expired-session sweeps.
+    SWEEP_INTERVAL = 30.0
+    #: Seconds between background flushes of dirty sessions to SQLite.
+    FLUSH_INTERVAL = 5.0
+    #: Expired rows deleted per cleanup transaction, so the write lock is
+    #: held for a bounded slice even after a large expiry backlog.
+    CLEANUP_BATCH = 500
+
     def __init__(self, default_timeout=3600, db_path=DB_PATH):
         self.default_timeout = default_timeout
         self.db_path = db_path
-        self.local = threading.local()
-        
+        self._pool = _ConnectionPool(db_path)
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+
+        # In-memory session cache: the hot path (get_session on almost
+        # every request) is a dict lookup; SQLite only sees the batched
+        # flush of dirty entries and explicit deletes.
+        self._lock = threading.RLock()
+        self._cache = {}
+        self._dirty = set()
+
         # Initialize database
         self._init_db()
-        print(f"[SessionManager] Using database: {self.db_path}")
+        self._load_cache()
+        logger.info("[SessionManager] Using database: %s", self.db_path)
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Flush pending sessions and release every pooled connection."""
+        try:
+            self._flush_dirty()
+        except Exception as e:
+            logger.error("[Session] Final flush failed: %s", e)
+        self._pool.close_all()
+
+    def _load_cache(self):
+        """Warm the cache with the sessions that survived a restart."""
+        now = time.time()
+        with self._get_connection() as conn:
+            rows = conn.execute(_SQL_LOAD, (now,)).fetchall()
+        with self._lock:
+            # plain-tuple rows unpacked positionally (column order pinned
+            # by _SQL_LOAD) — no sqlite3.Row name-to-index dispatch
+            for sid, username, created, accessed, expires, data in rows:
+                session = Session(sid, username, self.default_timeout,
+                                  now=now)
+                session.created_at = created
+                session.last_accessed = accessed
+                session.expires_at = expires
+                session.data = json.loads(data) if data else {}
+                self._cache[sid] = session
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            try:
+                self._flush_dirty()
+            except Exception as e:
+                logger.error("[Session] Flush failed: %s", e)
+
+    def _flush_dirty(self):
+        """Persist every dirty session in one batched transaction."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            # compact separators drop the space after ',' and ':' that
+            # json.dumps emits by default — smaller rows, nothing to undo
+            # on load since json.loads accepts both forms
+            rows = [
+                (s.session_id, s.username, s.created_at,
+                 s.last_accessed, s.expires_at,
+                 json.dumps(s.data, separators=(',', ':')))
+                for sid in self._dirty
+                if (s := self._cache.get(sid)) is not None
+            ]
+            self._dirty.clear()
+        if not rows:
+            return 0
+        with self._get_connection() as conn:
+            # one write transaction for the whole batch; committed on
+            # success, rolled back if the executemany raises
+            with conn:
+                conn.executemany(_SQL_FLUSH, rows)
+        return len(rows)
     
     def _init_db(self):
         """Create sessions table if it doesn't exist."""
         with self._get_connection() as conn:
+            # WAL lets get_session readers run concurrently with
+            # create/destroy writers instead of serializing on the
+            # rollback journal, and NORMAL sync drops the per-commit
+            # fsync (WAL still guarantees consistency on crash).
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA cache_size=-8000')
+            conn.execute('PRAGMA mmap_size=134217728')
+            conn.execute('PRAGMA wal_autocheckpoint=1000')
+            # WITHOUT ROWID clusters the row data on the session_id key
+            # itself: one B-tree descent per lookup instead of the default
+            # pk-index-then-rowid double descent.
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS sessions (
                     session_id TEXT PRIMARY KEY,
@@ -64,7 +271,7 @@ class SessionManager:
                     last_accessed REAL NOT NULL,
                     expires_at REAL NOT NULL,
                     data TEXT
-                )
+                ) WITHOUT ROWID
             ''')
             conn.execute('''
                 CREATE INDEX IF NOT EXISTS idx_expires 
@@ -74,109 +281,132 @@ class SessionManager:
     
     @contextmanager
     def _get_connection(self):
-        """Get thread-local database connection."""
-        if not hasattr(self.local, 'conn'):
-            self.local.conn = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False,
-                timeout=10.0
-            )
-            self.local.conn.row_factory = sqlite3.Row
-        
-        try:
-            yield self.local.conn
-        except Exception as e:
-            self.local.conn.rollback()
-            raise e
+        """Borrow a pooled database connection."""
+        with self._pool.connection() as conn:
+            yield conn
     
     def create_session(self, username):
-        """Create a new session in database."""
-        session_id = str(uuid.uuid4())
-        now = time.time()
-        expires_at = now + self.default_timeout
-        
-        with self._get_connection() as conn:
-            conn.execute('''
-                INSERT INTO sessions 
-                (session_id, username, created_at, last_accessed, expires_at, data)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (session_id, username, now, now, expires_at, '{}'))
-            conn.commit()
-        
+        """Create a new session in the cache; the flusher persists it."""
+        # token_urlsafe skips UUID object construction and gives a
+        # shorter, equally opaque cookie value; 16 bytes of entropy keeps
+        # the primary key at 22 chars, compacting the B-tree leaves
+        session_id = secrets.token_urlsafe(16)
+
         session = Session(session_id, username, self.default_timeout)
-        session.created_at = now
-        session.last_accessed = now
-        session.expires_at = expires_at
-        
-        print(f"[Session] Created session {session_id} for user '{username}'")
+        with self._lock:
+            self._cache[session_id] = session
+            self._dirty.add(session_id)
+
+        logger.debug("[Session] Created session %s for user '%s'", session_id, username)
         return session
     
     def get_session(self, session_id):
-        """Retrieve session from database."""
+        """Retrieve a session from the in-memory cache.
+
+        No SQL runs here: the lookup, the expiry check and the touch all
+        happen on the cached object, and the touched session is only
+        marked dirty for the background flusher to batch out.
+        """
         if not session_id:
             return None
-        
-        with self._get_connection() as conn:
-            row = conn.execute('''
-                SELECT * FROM sessions WHERE session_id = ?
-            ''', (session_id,)).fetchone()
-            
-            if not row:
-                return None
-            
-            # Check expiration
-            if row['expires_at'] < time.time():
-                print(f"[Session] Session {session_id} expired")
-                self.destroy_session(session_id)
+
+        # Syntactic precheck: real ids are 22-char token_urlsafe values
+        # (36 for legacy UUID cookies), so probe traffic with the wrong
+        # length or alphabet is rejected before any lock is taken.
+        if len(session_id) not in (22, 36) or not _SID_RE.fullmatch(session_id):
+            return None
+
+        self._maybe_sweep()
+
+        with self._lock:
+            session = self._cache.get(session_id)
+            if session is None:
                 return None
-            
-            # Create session object
-            session = Session(
-                session_id=row['session_id'],
-                username=row['username'],
-                timeout=self.default_timeout
-            )
-            session.created_at = row['created_at']
-            session.last_accessed = row['last_accessed']
-            session.expires_at = row['expires_at']
-            
-            # Update last accessed time
-            session.touch(self.default_timeout)
-            conn.execute('''
-                UPDATE sessions 
-                SET last_accessed = ?, expires_at = ?
-                WHERE session_id = ?
-            ''', (session.last_accessed, session.expires_at, session_id))
-            conn.commit()
-            
-            return session
+            now = time.time()
+            expired = now > session.expires_at
+            if not expired:
+                # Lazy touch: the refreshed expiry only needs persisting
+                # when a meaningful slice of the TTL was consumed, so a
+                # read burst doesn't re-flush the same session each cycle.
+                remaining = session.expires_at - now
+                session.touch(self.default_timeout, now)
+                if remaining < self.default_timeout * 0.25:
+                    self._dirty.add(session_id)
+
+        if expired:
+            logger.debug("[Session] Session %s expired", session_id)
+            self.destroy_session(session_id)
+            return None
+
+        return session
     
     def destroy_session(self, session_id):
-        """Delete session from database."""
+        """Delete session from cache and database."""
+        with self._lock:
+            self._cache.pop(session_id, None)
+            self._dirty.discard(session_id)
         with self._get_connection() as conn:
-            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
-            conn.commit()
-            print(f"[Session] Destroyed session {session_id}")
+            with conn:
+                conn.execute(_SQL_DELETE, (session_id,))
+            logger.debug("[Session] Destroyed session %s", session_id)
             return True
     
     def validate_session(self, session_id):
         """Validate session exists and not expired."""
         return self.get_session(session_id) is not None
     
+    def _maybe_sweep(self):
+        """Sweep expired sessions at most once per SWEEP_INTERVAL.
+
+        The interval check-and-update runs under a lock so only one of the
+        concurrent handler threads pays for the sweep; everyone else sees a
+        recent _last_sweep and returns immediately.
+        """
+        now = time.time()
+        with self._sweep_lock:
+            if now - self._last_sweep < self.SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+        return self.cleanup_expired_sessions()
+
     def cleanup_expired_sessions(self):
-        """Remove expired sessions from database."""
+        """Remove expired sessions from cache and database.
+
+        Deletes run in CLEANUP_BATCH-sized transactions with a short yield
+        in between, so a backlog of tens of thousands of expired rows never
+        pins the write lock for longer than one small batch; flushes and
+        destroys interleave between batches.
+        """
         now = time.time()
+        with self._lock:
+            expired = [sid for sid, s in self._cache.items()
+                       if s.expires_at < now]
+            for sid in expired:
+                del self._cache[sid]
+                self._dirty.discard(sid)
+
+        count = 0
         with self._get_connection() as conn:
-            cursor = conn.execute('''
-                DELETE FROM sessions WHERE expires_at < ?
-            ''', (now,))
-            count = cursor.rowcount
-            conn.commit()
-            
-            if count > 0:
-                print(f"[Session] Cleaned up {count} expired sessions")
-            
-            return count
+            while True:
+                # take the write lock up front so the batch doesn't
+                # upgrade mid-transaction under concurrent flushes
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    deleted = conn.execute(
+                        _SQL_CLEANUP, (now, self.CLEANUP_BATCH)).rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                count += deleted
+                if deleted < self.CLEANUP_BATCH:
+                    break
+                time.sleep(0.01)
+
+        if count > 0:
+            logger.debug("[Session] Cleaned up %d expired sessions", count)
+
+        return count
 
 
 # Global database session manager
@@ -46,6 +46,12 @@ from daemon import create_proxy
 
 PROXY_PORT = 8080
 
+#: Config grammar, compiled once at import: a host block, its proxy_pass
+#: backends, and the optional dist_policy directive.
+_HOST_RE = re.compile(r'host\s+"([^"]+)"\s*\{(.*?)\}', re.DOTALL)
+_PROXY_RE = re.compile(r'proxy_pass\s+http://([^\s;]+);')
+_POLICY_RE = re.compile(r'dist_policy\s+([\w-]+)')
+
 
 def parse_virtual_hosts(config_file):
     """
@@ -59,15 +65,15 @@ def parse_virtual_hosts(config_file):
         config_text = f.read()
 
     # Match each host block
-    host_blocks = re.findall(r'host\s+"([^"]+)"\s*\{(.*?)\}', config_text, re.DOTALL)
+    host_blocks = _HOST_RE.findall(config_text)
 
     routes = {}
     for host, block in host_blocks:
         # Find all proxy_pass entries
-        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+);', block)
+        proxy_passes = _PROXY_RE.findall(block)
         
         # Find dist_policy if present
-        policy_match = re.search(r'dist_policy\s+([\w-]+)', block)
+        policy_match = _POLICY_RE.search(block)
         dist_policy = policy_match.group(1) if policy_match else 'round-robin'
         
         # Build the routing configuration
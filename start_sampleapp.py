@@ -26,15 +26,27 @@ and can be configured via command-line arguments.
 
 import json
 import socket
+import logging
 import argparse
-peer_list = []
+from urllib.parse import parse_qsl
 from daemon.weaprous import WeApRous
 from db import peer_list
 from db import active_peers
 PORT = 8000  # Default port
 
+logger = logging.getLogger(__name__)
+
 app = WeApRous()
 
+
+def _form(body):
+    """Parse an urlencoded form body into a dict.
+
+    parse_qsl runs the split/percent-decode loop in C and handles '+'
+    and %XX escapes, which the old per-handler split('&') chains did not.
+    """
+    return dict(parse_qsl(body or "", keep_blank_values=True))
+
 @app.route('/login', methods=['POST'])
 def login(headers="guest", body="anonymous"):
     """
@@ -46,12 +58,12 @@ def login(headers="guest", body="anonymous"):
     :param headers (str): The request headers or user identifier.
     :param body (str): The request body or login payload.
     """
-    print("[SampleApp] Logging in {} to {}".format(headers, body))
+    logger.debug("[SampleApp] Logging in %s to %s", headers, body)
 
 
 @app.route('/logout', methods=['POST'])
 def logout(headers=None, body=None):
-    print("[SampleApp] Logging out {}".format(headers))
+    logger.debug("[SampleApp] Logging out %s", headers)
 
 @app.route('/hello', methods=['PUT'])
 def hello(headers, body):
@@ -64,14 +76,14 @@ def hello(headers, body):
     :param headers (str): The request headers or user identifier.
     :param body (str): The request body or message payload.
     """
-    print("[SampleApp] ['PUT'] Hello in {} to {}".format(headers, body))
+    logger.debug("[SampleApp] ['PUT'] Hello in %s to %s", headers, body)
 
 
 # đăng kí ip và port đến server trung tâm
 @app.route("/submit-info", methods=["POST"])
 def submit_info(headers=None, body=None):
 
-    print(f"[Submit] Received peer info: ")
+    logger.debug("[Submit] Received peer info")
 
 
 # thêm 1 peer trong danh sách peer vào danh sách peer-connected với peer hiện tại
@@ -81,7 +93,7 @@ def add_list(headers=None, body=None):
     Add a peer to active list
     Example body: ip=127.0.0.1&port=9002
     """
-    print("[SampleApp] add-List")
+    logger.debug("[SampleApp] add-List")
 
 # Lấy danh sách những peer đã kết nối với peer hiện tại, chọn POST do cần đính kém vài thông tin
 @app.route("/get-list", methods=["POST"])
@@ -89,7 +101,7 @@ def get_list(headers=None, body=None):
     """
     Return list of all active peers
     """
-    print("[SampleApp] Get-List")
+    logger.debug("[SampleApp] Get-List")
 
 # Kết nối với 1 peer trong danh sách connected để chat đơn bằng /send-peer
 @app.route("/connect-peer", methods=["POST"])
@@ -97,9 +109,9 @@ def connect_peer(headers=None, body=None):
     """
     Initiate connection to another peer
     """
-    params = dict(pair.split("=", 1) for pair in body.split("&") if "=" in pair)
+    params = _form(body)
     target = params.get("target", "")
-    print(f"[SampleApp] Connecting to peer {target}")
+    logger.debug("[SampleApp] Connecting to peer %s", target)
 
 # Nhắn với tất cả connected peer
 @app.route("/broadcast-peer", methods=["POST"])
@@ -107,7 +119,7 @@ def broadcast_peer(headers=None, body=None):
     """
     Broadcast message to all peers
     """
-    print(f"Broadcasted message to peers.")
+    logger.debug("Broadcasted message to peers.")
 
 # Nhắn với peer nào đó
 @app.route("/send-peer", methods=["POST"])
@@ -116,10 +128,10 @@ def send_peer(headers=None, body=None):
     Send message directly to one peer
     Example body: target=127.0.0.1:9002&message=Hello
     """
-    params = dict(pair.split("=", 1) for pair in body.split("&") if "=" in pair)
+    params = _form(body)
     target = params.get("target", "")
     message = params.get("message", "")
-    print(f"[SampleApp] Send to {target}: {message}")
+    logger.debug("[SampleApp] Send to %s: %s", target, message)
 # đồng bộ để hiển thị lên frontend
 @app.route("/get-messages", methods=["POST"])
 def get_messages(headers=None, body=None):
@@ -127,11 +139,11 @@ def get_messages(headers=None, body=None):
     pass
 # Lấy danh sách những peer đã kết nối với peer hiện tại
 @app.route("/get-total-peer", methods=["GET"])
-def get_list(headers=None, body=None):
+def get_total_peer(headers=None, body=None):
     """
     Return list of all active peers
     """
-    print("[SampleApp] Get-total-List")
+    logger.debug("[SampleApp] Get-total-List")
 @app.route("/get-connected", methods=["GET"])
 def get_connected(headers=None, body=None):
     # trả danh sách các peer đã connect
@@ -142,6 +154,8 @@ def remove_peer(headers=None, body=None):
     pass
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     # Parse command-line arguments to configure server IP and port
     parser = argparse.ArgumentParser(prog='Backend', description='', epilog='Beckend daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')